@@ -0,0 +1,34 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+from dotenv import load_dotenv
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    api_key: Optional[str]
+    server_mode: str
+    server_port: int
+    frontend_url: str
+    backend_url: str
+    api_prefix: str
+
+
+def load_config() -> Config:
+    # Load environment variables from .env file
+    load_dotenv()
+
+    server_mode = os.getenv("LOCATION_AUTOCOMPLETE_SERVER_MODE", "development")
+
+    return Config(
+        api_key=os.getenv("GOOGLE_PLACES_API_KEY"),
+        server_mode=server_mode,
+        server_port=int(os.getenv("LOCATION_AUTOCOMPLETE_SERVER_PORT") or 8080),
+        frontend_url=os.getenv("FRONTEND_URL", "http://localhost:3000"),
+        backend_url=os.getenv("BACKEND_URL", "http://localhost:8080"),
+        # Determine the prefix based on the server mode
+        api_prefix="/location-autocomplete" if server_mode == "release" else "",
+    )
+
+
+CFG = load_config()
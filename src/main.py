@@ -1,54 +1,43 @@
-from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.routing import APIRouter
 from fastapi.middleware.cors import CORSMiddleware
-import os
-from dotenv import load_dotenv
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.responses import ORJSONResponse, Response
+import asyncio
+import functools
+import orjson
 import httpx
-import pybreaker
-import requests
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-    RetryError,
-)
+from cachetools import TTLCache
+from src.config import CFG
 from src.cpuhealth import check_cpu_health
 from src.diskhealth import check_disk_health
-from src.models import HealthResponse
+from src.models import GeometryBatchRequest, HealthResponse
+from src.resilience import CircuitBreaker, CircuitBreakerError, RetryError, retry_async
 from prometheus_fastapi_instrumentator import Instrumentator
 from prometheus_client import Counter, Summary
 from time import time
 
-# Load environment variables from .env file
-load_dotenv()
-
-API_KEY = os.getenv("GOOGLE_PLACES_API_KEY")
-LOCATION_AUTOCOMPLETE_SERVER_MODE = os.getenv(
-    "LOCATION_AUTOCOMPLETE_SERVER_MODE", "development"
-)
-LOCATION_AUTOCOMPLETE_SERVER_PORT = os.getenv("LOCATION_AUTOCOMPLETE_SERVER_PORT", 8080)
-FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8080")
+API_PREFIX = CFG.api_prefix
 
-# Determine the prefix based on the server mode
-API_PREFIX = (
-    "/location-autocomplete" if LOCATION_AUTOCOMPLETE_SERVER_MODE == "release" else ""
-)
+OPENAPI_URL = f"{API_PREFIX}/openapi.json"
+DOCS_URL = f"{API_PREFIX}/docs"
+REDOC_URL = f"{API_PREFIX}/redoc"
 
+# The schema and docs routes are served from pre-encoded bytes, see the end of the module
 app = FastAPI(
     title="Location Autocomplete API",
     description="API for getting location suggestions, geometry, and name based on Google Places API",
     version="1.0.0",
-    openapi_url=f"{API_PREFIX}/openapi.json",
-    docs_url=f"{API_PREFIX}/docs",
-    redoc_url=f"{API_PREFIX}/redoc",
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
+    default_response_class=ORJSONResponse,
 )
 
 
 origins = [
-    FRONTEND_URL,
-    BACKEND_URL,
+    CFG.frontend_url,
+    CFG.backend_url,
     "http://localhost",
     "http://localhost:3000",
 ]
@@ -61,20 +50,73 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Breaker Configuration
-breaker = pybreaker.CircuitBreaker(fail_max=3, reset_timeout=30)
+# API routes are declared at bare paths and included under API_PREFIX at the end
+router = APIRouter()
+
+# Shared HTTP client for Google Places API, reusing pooled connections across requests
+CLIENT = httpx.AsyncClient(
+    base_url="https://maps.googleapis.com",
+    http2=True,
+    limits=httpx.Limits(
+        max_connections=100, max_keepalive_connections=50, keepalive_expiry=60.0
+    ),
+    timeout=httpx.Timeout(5.0, connect=2.0),
+)
+
+
+# Google Places API paths and the query parameters that never change per request
+AUTOCOMPLETE_PATH = "/maps/api/place/autocomplete/json"
+DETAILS_PATH = "/maps/api/place/details/json"
+TEXTSEARCH_PATH = "/maps/api/place/textsearch/json"
+
+AUTOCOMPLETE_PARAMS = httpx.QueryParams({"key": CFG.api_key, "sensor": "false"})
+DETAILS_PARAMS = httpx.QueryParams({"key": CFG.api_key, "fields": "geometry/location"})
+TEXTSEARCH_PARAMS = httpx.QueryParams({"query": "test", "key": CFG.api_key})
+
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await CLIENT.aclose()
+
 
+# Cache Configuration
+# place_id lookups are effectively immutable, suggestions change more often
+suggestions_cache = TTLCache(maxsize=10_000, ttl=300)
+geometry_cache = TTLCache(maxsize=10_000, ttl=86400)
 
-# Retry Configuration
-def is_transient_error(exception):
-    """Define what qualifies as a transient error."""
-    return isinstance(exception, requests.exceptions.RequestException)
 
+# Request coalescing: concurrent identical Google calls share one in-flight task
+inflight_requests = {}
 
-retry_strategy = retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=6),
-    retry=retry_if_exception_type(requests.exceptions.RequestException),
+
+def single_flight(key_func):
+    """Collapse concurrent calls with the same key into a single upstream call."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = (func.__name__, key_func(*args, **kwargs))
+            task = inflight_requests.get(key)
+            if task is None:
+                task = asyncio.ensure_future(func(*args, **kwargs))
+                inflight_requests[key] = task
+                task.add_done_callback(lambda _: inflight_requests.pop(key, None))
+
+            # Shield so a cancelled caller does not cancel the call for the others
+            return await asyncio.shield(task)
+
+        return wrapper
+
+    return decorator
+
+
+# Breaker Configuration
+breaker = CircuitBreaker(fail_max=3, reset_timeout=30)
+
+
+# Retry Configuration, only transport errors are transient
+retry_strategy = retry_async(
+    attempts=3, min_wait=2, max_wait=6, retry_on=httpx.RequestError
 )
 
 # Initialize Prometheus instrumentator
@@ -104,18 +146,32 @@ async def add_prometheus_metrics(request: Request, call_next):
 
 
 
+# httpx error messages contain the request URL, which carries the API key,
+# so only the upstream status is ever reported back to clients
+def upstream_error_detail(error: httpx.HTTPStatusError) -> str:
+    return f"API error: {error.response.status_code} {error.response.reason_phrase}"
+
+
+# Cached results are served before the breaker so they stay available during outages
+async def get_suggestions_from_google(input: str):
+    cached = suggestions_cache.get(input.lower())
+    if cached is not None:
+        return cached
+
+    return await fetch_suggestions_from_google(input)
+
+
 # Helper function with Circuit Breaker for getting suggestions
+@single_flight(lambda input: input.lower())
 @retry_strategy
 @breaker
-async def get_suggestions_from_google(input: str):
-    api_url = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
-    params = {"key": API_KEY, "sensor": "false", "input": input}
+async def fetch_suggestions_from_google(input: str):
+    params = AUTOCOMPLETE_PARAMS.merge({"input": input})
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(api_url, params=params)
+    response = await CLIENT.get(AUTOCOMPLETE_PATH, params=params)
 
     response.raise_for_status()
-    response_json = response.json()
+    response_json = orjson.loads(response.content)
 
     # Extract description and place_id from predictions
     predictions = response_json.get("predictions", [])
@@ -124,143 +180,330 @@ async def get_suggestions_from_google(input: str):
         for item in predictions
     ]
 
+    # Encode once so cached hits are spliced into the response without re-serializing
+    result = orjson.Fragment(orjson.dumps(result))
+
+    # Google reports quota and key errors with a 200 and empty predictions, never cache those
+    if response_json.get("status") in ("OK", "ZERO_RESULTS"):
+        suggestions_cache[input.lower()] = result
+
     return result
 
 
 # Get location suggestion based on string input
-@app.get(f"{API_PREFIX}/location/suggestions")
+@router.get("/location/suggestions")
 async def get_suggestions(input: str):
     try:
         result = await get_suggestions_from_google(input)
-        return {"suggestions": result}
+        # Returned as a response directly, jsonable_encoder cannot walk a Fragment
+        return ORJSONResponse({"suggestions": result})
 
-    except RetryError as retry_error:
+    except RetryError:
         raise HTTPException(
             status_code=503,
             detail="Service temporarily unavailable after multiple retry attempts. Please try again later.",
         )
 
-    except pybreaker.CircuitBreakerError:
+    except CircuitBreakerError:
         raise HTTPException(
             status_code=503,
             detail="Service temporarily unavailable due to repeated failures.",
         )
 
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=500, detail=f"Request failed: {str(e)}")
+    except httpx.RequestError:
+        raise HTTPException(
+            status_code=500, detail="Request to Google Places API failed"
+        )
 
     except httpx.HTTPStatusError as e:
         raise HTTPException(
-            status_code=response.status_code, detail=f"API error: {str(e)}"
+            status_code=e.response.status_code, detail=upstream_error_detail(e)
         )
 
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+
+# Cached results are served before the breaker so they stay available during outages
+async def get_geomtery_from_google(place_id: str):
+    cached = geometry_cache.get(place_id)
+    if cached is not None:
+        return cached
+
+    return await fetch_geomtery_from_google(place_id)
 
 
 # Helper function with Circuit Breaker for getting geometry
+@single_flight(lambda place_id: place_id)
 @retry_strategy
 @breaker
-async def get_geomtery_from_google(place_id: str):
-    api_url = "https://maps.googleapis.com/maps/api/place/details/json"
-    params = {"key": API_KEY, "fields": "geometry", "place_id": place_id}
+async def fetch_geomtery_from_google(place_id: str):
+    params = DETAILS_PARAMS.merge({"place_id": place_id})
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(api_url, params=params)
+    response = await CLIENT.get(DETAILS_PATH, params=params)
 
     response.raise_for_status()
-    response_json = response.json()
-
-    latitude = response_json["result"]["geometry"]["location"]["lat"]
-    longitude = response_json["result"]["geometry"]["location"]["lng"]
+    try:
+        response_json = orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+        return None
+
+    # Google reports unknown or invalid place_ids in the body without a result,
+    # so walk the path checking every level instead of raising on a bad shape
+    location = response_json
+    for key in ("result", "geometry", "location"):
+        if not isinstance(location, dict):
+            return None
+        location = location.get(key)
+    if not isinstance(location, dict):
+        return None
+
+    latitude = location.get("lat")
+    longitude = location.get("lng")
+    if latitude is None or longitude is None:
+        return None
+
+    geometry_cache[place_id] = (latitude, longitude)
 
     return latitude, longitude
 
 
 # Get location latitude and longitude based on place_id
-@app.get(f"{API_PREFIX}/location/geometry")
+@router.get("/location/geometry")
 async def get_geometry(place_id: str):
     try:
-        latitude, longitude = await get_geomtery_from_google(place_id)
-
+        geometry = await get_geomtery_from_google(place_id)
+        if geometry is None:
+            return ORJSONResponse(
+                status_code=502,
+                content={"detail": "Unexpected response from Google Places API"},
+            )
+
+        latitude, longitude = geometry
         return {
             "latitude": latitude,
             "longitude": longitude,
             "geometry": f"POINT({longitude} {latitude})",
         }
-    except RetryError as retry_error:
+    except RetryError:
         raise HTTPException(
             status_code=503,
             detail="Service temporarily unavailable after multiple retry attempts. Please try again later.",
         )
 
-    except pybreaker.CircuitBreakerError:
+    except CircuitBreakerError:
         raise HTTPException(
             status_code=503,
             detail="Service temporarily unavailable due to repeated failures.",
         )
 
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=500, detail=f"Request failed: {str(e)}")
+    except httpx.RequestError:
+        raise HTTPException(
+            status_code=500, detail="Request to Google Places API failed"
+        )
 
     except httpx.HTTPStatusError as e:
         raise HTTPException(
-            status_code=response.status_code, detail=f"API error: {str(e)}"
+            status_code=e.response.status_code, detail=upstream_error_detail(e)
         )
 
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+
+# Maximum concurrent Google calls made by a single batch request
+GEOMETRY_BATCH_CONCURRENCY = 10
+
+
+async def get_batch_geometry(place_id: str, semaphore: asyncio.Semaphore):
+    async with semaphore:
+        try:
+            geometry = await get_geomtery_from_google(place_id)
+        except (RetryError, CircuitBreakerError):
+            return {"place_id": place_id, "error": "Service temporarily unavailable"}
+        except httpx.HTTPStatusError as e:
+            return {"place_id": place_id, "error": upstream_error_detail(e)}
+
+    if geometry is None:
+        return {"place_id": place_id, "error": "Unexpected response from Google Places API"}
+
+    latitude, longitude = geometry
+
+    return {
+        "place_id": place_id,
+        "latitude": latitude,
+        "longitude": longitude,
+        "geometry": f"POINT({longitude} {latitude})",
+    }
+
+
+# Get latitude and longitude for multiple place_ids in one request
+@router.post("/location/geometry:batch")
+async def get_geometry_batch(request: GeometryBatchRequest):
+    semaphore = asyncio.Semaphore(GEOMETRY_BATCH_CONCURRENCY)
+    results = await asyncio.gather(
+        *(get_batch_geometry(place_id, semaphore) for place_id in request.place_ids),
+        return_exceptions=True,
+    )
+
+    # Any other failure is reported for its own place_id only, without its message
+    return {
+        "results": [
+            {"place_id": place_id, "error": "Failed to get geometry"}
+            if isinstance(result, BaseException)
+            else result
+            for place_id, result in zip(request.place_ids, results)
+        ]
+    }
+
+
+# Constant health payloads are encoded once, only the Response wrapper is per request
+STATUS_OK_BODY = b'{"status":"ok"}'
+STATUS_ERROR_BODY = b'{"status":"error"}'
+
+
+def status_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
 
 
 # Health check endpoint
-@app.get(f"{API_PREFIX}/health/liveness")
+@router.get("/health/liveness")
 async def liveness_check():
-    return {"status": "ok"}
+    return status_response(STATUS_OK_BODY)
+
+
+# Probes fire every few seconds, so keep the upstream result to save quota
+google_places_health_cache = TTLCache(maxsize=1, ttl=30)
+
+
+async def check_google_places() -> bool:
+    cached = google_places_health_cache.get("google-places")
+    if cached is not None:
+        return cached
+
+    return await probe_google_places()
+
+
+@single_flight(lambda: "google-places")
+async def probe_google_places() -> bool:
+    # Only the status code matters, the body is never parsed
+    response = await CLIENT.get(
+        TEXTSEARCH_PATH, params=TEXTSEARCH_PARAMS, timeout=httpx.Timeout(1.5)
+    )
+    google_places_ok = response.status_code < 500
+    google_places_health_cache["google-places"] = google_places_ok
+
+    return google_places_ok
 
 
 # Health check Google Places API
-@app.get(f"{API_PREFIX}/health/google-places")
+@router.get("/health/google-places")
 async def google_places_api_health_check():
-    params = {
-        "query": "test",
-        "key": API_KEY,
-    }
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get('https://maps.googleapis.com/maps/api/place/textsearch/json', params=params)
-            if response.status_code == 200 and "results" in response.json():
-                return {"status": "ok"}
-            else:
-                return {
-                    "status": "error",
-                    "detail": "Unexpected response from Google Places API",
-                }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
+        google_places_ok = await check_google_places()
+    except Exception:
+        raise HTTPException(status_code=500, detail="Health check failed")
+
+    if google_places_ok:
+        return status_response(STATUS_OK_BODY)
+
+    return {
+        "status": "error",
+        "detail": "Unexpected response from Google Places API",
+    }
+
+
+# psutil checks block (CPU sampling takes a second), so run them off the event
+# loop and reuse the result briefly since probes fire every few seconds
+system_health_cache = TTLCache(maxsize=8, ttl=5)
+
+
+async def get_system_health(check):
+    cached = system_health_cache.get(check.__name__)
+    if cached is not None:
+        return cached
+
+    return await run_system_health_check(check)
+
+
+@single_flight(lambda check: check.__name__)
+async def run_system_health_check(check):
+    health = await asyncio.to_thread(check)
+    system_health_cache[check.__name__] = health
+
+    return health
+
+
+# Serialize health models with pydantic-core directly, skipping jsonable_encoder
+def health_response(health: HealthResponse) -> Response:
+    return Response(content=health.model_dump_json(), media_type="application/json")
 
 
 # Health check CPU
-@app.get(f"{API_PREFIX}/health/cpu", response_model=HealthResponse)
+@router.get("/health/cpu", responses={200: {"model": HealthResponse}})
 async def cpu_health_check():
-    cpu_health = check_cpu_health()
-    return HealthResponse(status=cpu_health.status, components={"cpu": cpu_health})
+    cpu_health = await get_system_health(check_cpu_health)
+    return health_response(
+        HealthResponse(status=cpu_health.status, components={"cpu": cpu_health})
+    )
 
 
 # Health check memory
-@app.get(f"{API_PREFIX}/health/disk", response_model=HealthResponse)
+@router.get("/health/disk", responses={200: {"model": HealthResponse}})
 async def disk_health_check():
-    disk_health = check_disk_health()
-    return HealthResponse(status=disk_health.status, components={"disk": disk_health})
+    disk_health = await get_system_health(check_disk_health)
+    return health_response(
+        HealthResponse(status=disk_health.status, components={"disk": disk_health})
+    )
 
 
-@app.get(f"{API_PREFIX}/health/readiness")
+@router.get("/health/readiness")
 async def readiness_check():
-    liveness = await liveness_check()
-    google_places_health = await google_places_api_health_check()
-    cpu_health = check_cpu_health()
-    disk_health = check_disk_health()
+    try:
+        google_places_ok, cpu_health, disk_health = await asyncio.gather(
+            check_google_places(),
+            get_system_health(check_cpu_health),
+            get_system_health(check_disk_health),
+        )
+    except Exception:
+        raise HTTPException(status_code=500, detail="Health check failed")
 
-    if liveness["status"] == "ok" and cpu_health.status == "UP" and disk_health.status == "UP" and google_places_health["status"] == "ok":
-        return {"status": "ok"}
+    if google_places_ok and cpu_health.status == "UP" and disk_health.status == "UP":
+        return status_response(STATUS_OK_BODY)
     else:
-        return {"status": "error"}
+        return status_response(STATUS_ERROR_BODY)
+
+
+app.include_router(router, prefix=API_PREFIX)
+
+
+# The schema is static once all routes are registered, so encode it and the docs once
+@functools.cache
+def get_openapi_bytes() -> bytes:
+    return orjson.dumps(app.openapi())
+
+
+@functools.cache
+def get_docs_bytes() -> bytes:
+    return get_swagger_ui_html(openapi_url=OPENAPI_URL, title=f"{app.title} - Swagger UI").body
+
+
+@functools.cache
+def get_redoc_bytes() -> bytes:
+    return get_redoc_html(openapi_url=OPENAPI_URL, title=f"{app.title} - ReDoc").body
+
+
+@app.on_event("startup")
+async def encode_openapi():
+    get_openapi_bytes()
+    get_docs_bytes()
+    get_redoc_bytes()
+
+
+@app.get(OPENAPI_URL, include_in_schema=False)
+async def openapi():
+    return Response(content=get_openapi_bytes(), media_type="application/json")
+
+
+@app.get(DOCS_URL, include_in_schema=False)
+async def swagger_ui():
+    return Response(content=get_docs_bytes(), media_type="text/html")
+
+
+@app.get(REDOC_URL, include_in_schema=False)
+async def redoc():
+    return Response(content=get_redoc_bytes(), media_type="text/html")
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Dict, Union
+from pydantic import BaseModel, Field
+from typing import Dict, List, Union
 
 class HealthStatus:
     UP = "UP"
@@ -11,4 +11,7 @@ class HealthComponent(BaseModel):
 
 class HealthResponse(BaseModel):
     status: str
-    components: Dict[str, HealthComponent]
\ No newline at end of file
+    components: Dict[str, HealthComponent]
+
+class GeometryBatchRequest(BaseModel):
+    place_ids: List[str] = Field(min_length=1, max_length=100)
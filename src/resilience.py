@@ -0,0 +1,78 @@
+import asyncio
+import functools
+from time import monotonic
+
+
+class RetryError(Exception):
+    """Raised when every retry attempt failed with a transient error."""
+
+
+class CircuitBreakerError(Exception):
+    """Raised when a call is rejected because the circuit is open."""
+
+
+def retry_async(attempts, min_wait, max_wait, retry_on):
+    """Retry an async function on `retry_on` errors with exponential backoff."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            # Happy path is a single await, state is only built on failure
+            try:
+                return await func(*args, **kwargs)
+            except retry_on as e:
+                last_error = e
+
+            for attempt in range(1, attempts):
+                await asyncio.sleep(min(max(2 ** (attempt - 1), min_wait), max_wait))
+                try:
+                    return await func(*args, **kwargs)
+                except retry_on as e:
+                    last_error = e
+
+            raise RetryError(f"Failed after {attempts} attempts") from last_error
+
+        return wrapper
+
+    return decorator
+
+
+class CircuitBreaker:
+    """Async circuit breaker, opened after `fail_max` consecutive failures."""
+
+    def __init__(self, fail_max, reset_timeout):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.fail_counter = 0
+        self.opened_at = None
+        self.half_open_trial = False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            trial = False
+            if self.opened_at is not None:
+                # Let a single trial call through once the reset timeout passed
+                if self.half_open_trial or monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitBreakerError("Circuit breaker is open")
+                self.half_open_trial = trial = True
+
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                self.fail_counter += 1
+                if trial or self.fail_counter >= self.fail_max:
+                    self.opened_at = monotonic()
+                raise
+            finally:
+                # A cancelled trial is not a failure, but must free the slot for the next one
+                if trial:
+                    self.half_open_trial = False
+
+            if self.fail_counter or self.opened_at is not None:
+                self.fail_counter = 0
+                self.opened_at = None
+
+            return result
+
+        return wrapper